@@ -2,6 +2,7 @@ import json
 import os
 from dotenv import load_dotenv
 import load_images
+import json_stream
 from datetime import datetime
 from PIL import Image
 from io import BytesIO
@@ -17,6 +18,9 @@ openai_api_key = os.environ.get("OPENAI_API_KEY")
 # Initialize OpenAI Client
 client = OpenAI(api_key=openai_api_key)
 
+# Stream bill extraction and parse items incrementally (set STREAM_BILLS=true)
+stream_bills = os.environ.get("STREAM_BILLS", "false").lower() == "true"
+
 # API URL
 url = "http://localhost:8000/"
 
@@ -96,32 +100,56 @@ IMPORTANT: Make sure to capture EVERY single item mentioned on the receipt, even
                 is_bill = False
                 prompt = "What is this food dish? Provide ONLY the dish name in 1-3 words. For example: 'Chicken Tikka Masala', 'Biryani', 'Hot Dog', etc. No descriptions, just the name."
             
-            # Send the image to GPT for analysis
-            gpt_completion = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": prompt},
-                            {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}}
-                        ]
-                    }
-                ]
-            )
+            messages = [
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": prompt},
+                        {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}}
+                    ]
+                }
+            ]
             
-            # Get the response content
-            description = gpt_completion.choices[0].message.content
+            bill_parser = None
+            if is_bill and stream_bills:
+                # Stream the extraction and parse bill items as they arrive
+                gpt_stream = client.chat.completions.create(
+                    model="gpt-4o",
+                    messages=messages,
+                    stream=True
+                )
+                bill_parser = json_stream.parse_bill_stream(
+                    (chunk.choices[0].delta.content for chunk in gpt_stream if chunk.choices),
+                    on_item=lambda item: print(f"Image {i+1}: Streamed item {item['name']}")
+                )
+                description = bill_parser.text
+            else:
+                # Send the image to GPT for analysis
+                gpt_completion = client.chat.completions.create(
+                    model="gpt-4o",
+                    messages=messages
+                )
+                
+                # Get the response content
+                description = gpt_completion.choices[0].message.content
             
             # Handle bill vs food differently
             if is_bill:
                 try:
-                    # Clean up the JSON if it contains markdown formatting or extra characters
-                    if description.startswith("```json"):
-                        description = description.replace("```json", "").replace("```", "").strip()
-                    
-                    # Try to parse as JSON
-                    json_data = json.loads(description)
+                    if bill_parser is not None:
+                        # Repair any truncated or slightly malformed output locally
+                        json_data = bill_parser.close()
+                        if bill_parser.repaired:
+                            print(f"Warning: Image {i+1}: bill JSON was malformed and repaired locally")
+                            for fragment in bill_parser.dropped:
+                                print(f"  Dropped: {fragment}")
+                    else:
+                        # Clean up the JSON if it contains markdown formatting or extra characters
+                        if description.startswith("```json"):
+                            description = description.replace("```json", "").replace("```", "").strip()
+                        
+                        # Try to parse as JSON
+                        json_data = json.loads(description)
                     
                     # Add verification step for bills to catch missing items
                     verification_prompt = """Please look at this receipt image one more time and list ONLY any short, single-word items or easily missed items that might be on the receipt (like "RICE", "SODA", "WATER", etc.). 
@@ -2,6 +2,7 @@ import json
 import os
 from dotenv import load_dotenv
 import load_images
+import json_stream
 from datetime import datetime
 from PIL import Image
 from io import BytesIO
@@ -16,6 +17,9 @@ gemini_api_key = os.environ.get("GEMINI_API_KEY")
 # Initialize Gemini Client
 client = genai.Client(api_key=gemini_api_key)
 
+# Stream bill extraction and parse items incrementally (set STREAM_BILLS=true)
+stream_bills = os.environ.get("STREAM_BILLS", "false").lower() == "true"
+
 # API URL
 url = "http://localhost:8000/"
 
@@ -80,24 +84,45 @@ IMPORTANT: Pay special attention to single-word items (like "RICE") which can be
             else:
                 prompt = "What is this food dish? Provide ONLY the dish name in 1-3 words. For example: 'Chicken Tikka Masala', 'Biryani', 'Hot Dog', etc. No descriptions, just the name."
             
-            # Send the image to Gemini for analysis
-            gemini_response = client.models.generate_content(
-                model="gemini-2.0-flash",
-                contents=[image, prompt]
-            )
-            
-            # Get the response content
-            description = gemini_response.text
+            bill_parser = None
+            if is_bill and stream_bills:
+                # Stream the extraction and parse bill items as they arrive
+                gemini_stream = client.models.generate_content_stream(
+                    model="gemini-2.0-flash",
+                    contents=[image, prompt]
+                )
+                bill_parser = json_stream.parse_bill_stream(
+                    (chunk.text for chunk in gemini_stream),
+                    on_item=lambda item: print(f"Image {i+1}: Streamed item {item['name']}")
+                )
+                description = bill_parser.text
+            else:
+                # Send the image to Gemini for analysis
+                gemini_response = client.models.generate_content(
+                    model="gemini-2.0-flash",
+                    contents=[image, prompt]
+                )
+                
+                # Get the response content
+                description = gemini_response.text
             
             # Handle bill vs food differently
             if is_bill:
                 try:
-                    # Clean up the JSON if it contains markdown formatting or extra characters
-                    if description.startswith("```json"):
-                        description = description.replace("```json", "").replace("```", "").strip()
-                    
-                    # Try to parse as JSON
-                    json_data = json.loads(description)
+                    if bill_parser is not None:
+                        # Repair any truncated or slightly malformed output locally
+                        json_data = bill_parser.close()
+                        if bill_parser.repaired:
+                            print(f"Warning: Image {i+1}: bill JSON was malformed and repaired locally")
+                            for fragment in bill_parser.dropped:
+                                print(f"  Dropped: {fragment}")
+                    else:
+                        # Clean up the JSON if it contains markdown formatting or extra characters
+                        if description.startswith("```json"):
+                            description = description.replace("```json", "").replace("```", "").strip()
+                        
+                        # Try to parse as JSON
+                        json_data = json.loads(description)
                     
                     # Add verification step for bills to catch missing items
                     verification_prompt = """Analyze this receipt image carefully. 
@@ -0,0 +1,378 @@
+import json
+import re
+
+# Characters that can start a bare JSON literal (numbers, true, false, null)
+LITERAL_START_CHARS = set("0123456789-tfn")
+
+# Characters that end stray text outside a string
+STRUCTURAL_CHARS = set('"{}[],:')
+
+JSON_NUMBER = re.compile(r"-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?")
+
+CLOSERS = {'{': '}', '[': ']'}
+
+
+class BillStreamParser:
+    # Incrementally parses a model's bill JSON as it streams in.
+    #
+    # Text before the bill object (such as a ```json fence or a short
+    # preamble) and anything after it closes is ignored. A top-level object
+    # without an "items" key is treated as prose and parsing restarts at the
+    # next '{'. Every complete entry of the "items" array with a "name" is
+    # returned from feed() (and passed to on_item) as soon as its closing
+    # brace arrives. close() repairs truncated or slightly malformed output
+    # (trailing or missing commas, missing colons, unterminated strings,
+    # unclosed or mismatched brackets) and returns the parsed bill. A literal
+    # that is complete when the stream ends is kept, so a trailing
+    # "total": 5 survives even though it might have been cut from 5.50.
+    # Any repair sets `repaired`, and text that had to be thrown away is
+    # listed in `dropped`.
+
+    def __init__(self, array_key="items", required_key="name", on_item=None):
+        self.array_key = array_key
+        self.required_key = required_key
+        self.on_item = on_item
+        self.text = ""
+        self.items = []
+        self._pos = 0
+        self._done = False
+        self._reset()
+
+    def _reset(self):
+        # Prose skipped before the bill doesn't count as a repair
+        self.repaired = False
+        self.dropped = []
+        self._out = []
+        self._stack = []
+        self._started = False
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._string_is_key = False
+        self._in_literal = False
+        self._literal_start = 0
+        self._stray = []
+
+    def feed(self, chunk):
+        # Consume the next piece of streamed text and return any newly completed items
+        if not chunk:
+            return []
+        self.text += chunk
+        count = len(self.items)
+        while self._pos < len(self.text) and not self._done:
+            char = self.text[self._pos]
+            self._pos += 1
+            self._consume(char)
+        return self.items[count:]
+
+    def close(self):
+        # Finish the stream, repair whatever is left open and return the parsed bill
+        if not self._started and not self._done:
+            raise json.JSONDecodeError("No JSON object found in response", self.text, 0)
+
+        if not self._done:
+            self.repaired = True
+            self._flush_stray()
+            # A literal that already parses is kept, anything else cut off
+            # mid-way is dropped along with its member
+            if self._in_literal:
+                self._end_literal()
+            if self._in_string:
+                self._in_string = False
+                self._truncate(self._stack[-1])
+
+            while self._stack:
+                frame = self._stack[-1]
+                if not self._member_complete(frame):
+                    self._truncate(frame)
+                self._close_frame(finishing=True)
+            self._done = True
+
+        bill = json.loads("".join(self._out))
+        if not isinstance(bill, dict) or not isinstance(bill.get(self.array_key), list):
+            raise json.JSONDecodeError(f"No '{self.array_key}' found in response", self.text, 0)
+        return bill
+
+    def _consume(self, char):
+        if not self._started:
+            if char == '{':
+                self._started = True
+                self._open('{')
+            return
+
+        if self._in_string:
+            self._consume_string_char(char)
+            return
+
+        if self._in_literal:
+            if char.isalnum() or char in "+-.":
+                self._out.append(char)
+                return
+            self._end_literal()
+            # The character that ended the literal still needs handling below
+
+        frame = self._stack[-1]
+
+        if char == '`' and not self._stack[0]["has_array"]:
+            # A code fence before the bill's items means the '{' so far was prose
+            self._reset()
+            return
+
+        if self._stray and char not in STRUCTURAL_CHARS:
+            self._stray.append(char)
+            return
+
+        if char.isspace():
+            return
+
+        if char not in STRUCTURAL_CHARS:
+            if char in LITERAL_START_CHARS and self._start_value(frame):
+                self._in_literal = True
+                self._literal_start = len(self._out)
+                self._out.append(char)
+            else:
+                # Anything else outside a string is stray text, e.g. a comment
+                self._stray.append(char)
+            return
+
+        self._flush_stray()
+
+        if char == '"':
+            if frame["kind"] == '{' and frame["state"] in ("key", "after"):
+                self._start_key(frame)
+                self._string_is_key = True
+            else:
+                self._start_value(frame)
+                self._string_is_key = False
+            self._in_string = True
+            self._string_start = len(self._out)
+            self._out.append(char)
+            return
+
+        if char == ':':
+            if frame["state"] == "colon":
+                self._out.append(char)
+                frame["state"] = "value"
+            else:
+                self.repaired = True
+            return
+
+        if char == ',':
+            if not self._member_complete(frame):
+                # e.g. {"x": , "y": 1} - drop the key that never got a value
+                self._truncate(frame)
+            if frame["state"] == "after":
+                frame["pending_comma"] = True
+                frame["state"] = "key" if frame["kind"] == '{' else "value"
+            else:
+                self.repaired = True
+            return
+
+        if char in '{[':
+            if self._start_value(frame):
+                self._open(char, parent=frame)
+            else:
+                self.repaired = True
+            return
+
+        self._close_bracket(char)
+
+    def _flush_stray(self):
+        # Record a run of skipped text as one fragment
+        fragment = "".join(self._stray).strip()
+        self._stray = []
+        if fragment:
+            self.repaired = True
+            self.dropped.append(fragment)
+
+    def _close_bracket(self, closer):
+        frame = self._stack[-1]
+        if CLOSERS[frame["kind"]] == closer:
+            self._close_frame()
+            return
+
+        self.repaired = True
+        parent = self._stack[-2] if len(self._stack) > 1 else None
+        if parent is None or CLOSERS[parent["kind"]] != closer or self._out[-1] == closer:
+            # A doubled closer like }} or ]] or one with nothing to match, skip it
+            self.dropped.append(closer)
+            return
+        # e.g. ["x"} - the model forgot to close the inner frame first
+        self._close_frame()
+        self._close_frame()
+
+    def _consume_string_char(self, char):
+        if self._escape:
+            self._escape = False
+            self._out.append(char)
+            return
+        if char == '\\':
+            self._escape = True
+            self._out.append(char)
+            return
+        if char == '"':
+            self._in_string = False
+            self._out.append(char)
+            frame = self._stack[-1]
+            if self._string_is_key:
+                try:
+                    frame["key"] = json.loads("".join(self._out[self._string_start:]))
+                except json.JSONDecodeError:
+                    frame["key"] = None
+                if len(self._stack) == 1 and frame["key"] == self.array_key:
+                    frame["has_array"] = True
+                frame["state"] = "colon"
+            else:
+                self._value_complete()
+            return
+        # Raw newlines and tabs inside strings are invalid JSON, escape them
+        if char in '\n\t\r':
+            self.repaired = True
+        if char == '\n':
+            self._out.append('\\n')
+        elif char == '\t':
+            self._out.append('\\t')
+        elif char != '\r':
+            self._out.append(char)
+
+    def _start_key(self, frame):
+        # Emit the comma before this key, adding it back if the model forgot it
+        if frame["state"] == "after":
+            self.repaired = True
+            self._out.append(',')
+        elif frame["pending_comma"]:
+            self._out.append(',')
+        frame["pending_comma"] = False
+        frame["state"] = "key"
+
+    def _start_value(self, frame):
+        # Prepare the frame for a new value, returning False if none is allowed here
+        if frame["kind"] == '{':
+            if frame["state"] == "colon":
+                # e.g. {"name" "RICE"} - add the missing colon
+                self.repaired = True
+                self._out.append(':')
+                frame["state"] = "value"
+            return frame["state"] == "value"
+
+        if frame["state"] == "after":
+            # e.g. [1, 2 3] - add the missing comma
+            self.repaired = True
+            self._out.append(',')
+        elif frame["pending_comma"]:
+            self._out.append(',')
+        frame["pending_comma"] = False
+        frame["state"] = "value"
+        return True
+
+    def _end_literal(self):
+        self._in_literal = False
+        literal = "".join(self._out[self._literal_start:])
+        if literal in ("true", "false", "null"):
+            self._value_complete()
+            return
+        match = JSON_NUMBER.match(literal)
+        if match is None:
+            self._truncate(self._stack[-1])
+            return
+        if match.end() < len(literal):
+            # e.g. "12." or "12USD" - keep the number, report the rest
+            self.repaired = True
+            self.dropped.append(literal[match.end():])
+            del self._out[self._literal_start:]
+            self._out.append(match.group())
+        self._value_complete()
+
+    def _open(self, kind, parent=None):
+        is_items = (
+            kind == '['
+            and parent is not None
+            and len(self._stack) == 1
+            and parent["key"] == self.array_key
+        )
+        is_item = kind == '{' and parent is not None and parent["is_items"]
+        frame = {
+            "kind": kind,
+            "state": "key" if kind == '{' else "value",
+            "key": None,
+            "has_array": False,
+            "pending_comma": False,
+            "is_items": is_items,
+            "is_item": is_item,
+            "start": len(self._out),
+            "safe": len(self._out) + 1,
+        }
+        self._out.append(kind)
+        self._stack.append(frame)
+
+    def _close_frame(self, finishing=False):
+        frame = self._stack.pop()
+        if frame["pending_comma"]:
+            # e.g. [1, 2,] - the trailing comma is simply not emitted
+            self.repaired = True
+        if not self._member_complete(frame):
+            # e.g. {"name": } - drop the dangling key
+            self._truncate(frame)
+        self._out.append(CLOSERS[frame["kind"]])
+
+        if not self._stack:
+            if frame["has_array"] or finishing:
+                self._done = True
+            else:
+                # The object had no items, so it was prose like "{the}"
+                self._reset()
+            return
+
+        if frame["is_item"]:
+            try:
+                item = json.loads("".join(self._out[frame["start"]:]))
+            except json.JSONDecodeError:
+                item = None
+            if not isinstance(item, dict) or not isinstance(item.get(self.required_key), str):
+                # An item without a usable name can't be reconciled, drop it
+                self._truncate(self._stack[-1])
+                return
+            parent = self._stack[-1]
+            parent["state"] = "after"
+            parent["safe"] = len(self._out)
+            self.items.append(item)
+            if self.on_item is not None:
+                self.on_item(item)
+            return
+
+        self._value_complete()
+
+    def _member_complete(self, frame):
+        if frame["kind"] == '{':
+            return frame["state"] in ("key", "after")
+        return frame["state"] in ("value", "after")
+
+    def _truncate(self, frame):
+        # Roll back to just after the frame's last complete member
+        fragment = "".join(self._out[frame["safe"]:]).strip(", ")
+        if fragment:
+            self.repaired = True
+            self.dropped.append(fragment)
+        del self._out[frame["safe"]:]
+        frame["state"] = "after" if frame["safe"] > frame["start"] + 1 else (
+            "key" if frame["kind"] == '{' else "value"
+        )
+        frame["pending_comma"] = False
+
+    def _value_complete(self):
+        frame = self._stack[-1]
+        if frame["is_items"]:
+            # Only objects are bill items, drop stray strings, numbers and lists
+            self._truncate(frame)
+            return
+        frame["state"] = "after"
+        frame["safe"] = len(self._out)
+
+
+def parse_bill_stream(chunks, on_item=None):
+    # Feed an iterable of text chunks through a BillStreamParser, calling
+    # on_item for each bill item as soon as it is complete
+    parser = BillStreamParser(on_item=on_item)
+    for chunk in chunks:
+        parser.feed(chunk)
+    return parser
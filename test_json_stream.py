@@ -0,0 +1,169 @@
+import json
+
+import pytest
+
+import json_stream
+
+BILL = {
+    "store_name": "Kitchen Printer",
+    "items": [
+        {"name": "CHICKEN TIKKA MASALA", "quantity": 1, "price": 12.5},
+        {"name": "RICE"},
+        {"name": "NAAN", "specifications": "butter", "price": 3},
+    ],
+    "total": 15.5,
+}
+
+
+def parse(text, chunk_size=None):
+    streamed = []
+    parser = json_stream.BillStreamParser(on_item=streamed.append)
+    chunk_size = chunk_size or len(text) or 1
+    for start in range(0, len(text), chunk_size):
+        parser.feed(text[start:start + chunk_size])
+    bill = parser.close()
+    # Whatever was streamed downstream must match what gets saved
+    assert streamed == parser.items == bill["items"]
+    return bill, parser
+
+
+def test_fenced_input():
+    text = "Here is the bill:\n```json\n" + json.dumps(BILL, indent=2) + "\n```"
+    bill, parser = parse(text)
+    assert bill == BILL
+    assert not parser.repaired
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7])
+def test_chunked_input_emits_items_as_they_complete(chunk_size):
+    text = "```json\n" + json.dumps(BILL) + "\n```"
+    parser = json_stream.BillStreamParser()
+    emitted_at = []
+    for start in range(0, len(text), chunk_size):
+        for item in parser.feed(text[start:start + chunk_size]):
+            emitted_at.append((start, item["name"]))
+    assert parser.close() == BILL
+    assert [name for _, name in emitted_at] == ["CHICKEN TIKKA MASALA", "RICE", "NAAN"]
+    # Each item is emitted before the next one starts streaming
+    assert emitted_at[0][0] < text.index('{"name": "RICE"}')
+    assert emitted_at[1][0] < text.index('{"name": "NAAN"')
+
+
+def test_truncated_mid_string():
+    bill, parser = parse('{"items": [{"name": "RICE"}, {"name": "NA')
+    assert bill == {"items": [{"name": "RICE"}]}
+    assert parser.repaired
+    assert parser.dropped
+
+
+def test_truncated_mid_literal():
+    bill, parser = parse('{"items": [{"name": "RICE"}], "tax": tru')
+    assert bill == {"items": [{"name": "RICE"}]}
+    assert parser.dropped == ['"tax":tru']
+
+
+def test_truncated_mid_item_drops_nameless_item():
+    bill, parser = parse('{"items": [{"name": "RICE"}, {"quantity": 2, "name": "NA')
+    assert bill == {"items": [{"name": "RICE"}]}
+    assert parser.repaired
+
+
+def test_trailing_and_missing_commas():
+    text = '{"items": [{"name": "A", "price": 1,} {"name": "B"},], "total": 1 ,}'
+    bill, parser = parse(text)
+    assert bill == {"items": [{"name": "A", "price": 1}, {"name": "B"}], "total": 1}
+    assert parser.repaired
+    assert not parser.dropped
+
+
+def test_missing_comma_before_literal():
+    parser = json_stream.BillStreamParser()
+    parser.feed('{"items": [], "quantities": [1, 2 3], "tax": 12.}')
+    assert parser.close() == {"items": [], "quantities": [1, 2, 3], "tax": 12}
+
+
+def test_missing_colon():
+    bill, _ = parse('{"items": [{"name" "B"}]}')
+    assert bill == {"items": [{"name": "B"}]}
+
+
+def test_raw_newline_in_string():
+    bill, parser = parse('{"items": [{"name": "RICE\nplain"}]}')
+    assert bill == {"items": [{"name": "RICE\nplain"}]}
+    assert parser.repaired
+
+
+def test_brace_in_prose_before_fence():
+    bill, parser = parse('Here is {the} result ```json {"items":[{"name":"A"}]}```')
+    assert bill == {"items": [{"name": "A"}]}
+    assert not parser.repaired
+
+
+def test_unclosed_brace_in_prose_before_fence():
+    bill, _ = parse('Here is {the result ```json\n{"items":[{"name":"A"}]}\n```')
+    assert bill == {"items": [{"name": "A"}]}
+
+
+@pytest.mark.parametrize("text", ["", "no json here", '{"store_name": "Taj"}', '{"items": '])
+def test_missing_items_raises(text):
+    parser = json_stream.BillStreamParser()
+    parser.feed(text)
+    with pytest.raises(json.JSONDecodeError):
+        parser.close()
+
+
+def test_parse_bill_stream_skips_empty_chunks():
+    streamed = []
+    parser = json_stream.parse_bill_stream(
+        [None, '{"items": [{"na', "", 'me": "RICE"}]}'],
+        on_item=streamed.append,
+    )
+    assert streamed == [{"name": "RICE"}]
+    assert parser.close() == {"items": [{"name": "RICE"}]}
+
+
+@pytest.mark.parametrize("text, expected, dropped", [
+    (
+        '{"items":[{"name":"A","mods":["x"}, {"name":"B"}], "total": 5}',
+        {"items": [{"name": "A", "mods": ["x"]}, {"name": "B"}], "total": 5},
+        [],
+    ),
+    (
+        '{"items": [{"name":"A"}}, {"name":"B"}], "total": 5}',
+        {"items": [{"name": "A"}, {"name": "B"}], "total": 5},
+        ["}"],
+    ),
+    (
+        '{"items": [{"name":"A"}]], "total": 5}',
+        {"items": [{"name": "A"}], "total": 5},
+        ["]"],
+    ),
+])
+def test_mismatched_brackets(text, expected, dropped):
+    bill, parser = parse(text)
+    assert bill == expected
+    assert parser.repaired
+    assert parser.dropped == dropped
+
+
+def test_stray_words_are_dropped_as_one_fragment():
+    bill, parser = parse('{"items": [{"name": "A"} // a comment\n, {"name": "B"}], "x": Infinity, "y": 1}')
+    assert bill == {"items": [{"name": "A"}, {"name": "B"}], "y": 1}
+    assert parser.dropped == ["// a comment", "Infinity", '"x":']
+
+
+def test_number_with_trailing_text():
+    bill, parser = parse('{"items": [{"name": "B", "price": 12USD, "paid": true}]}')
+    assert bill == {"items": [{"name": "B", "price": 12, "paid": True}]}
+    assert parser.dropped == ["USD"]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"items": [{"name": "A"}], "total": 5', {"items": [{"name": "A"}], "total": 5}),
+    ('{"items": [{"name": "B", "price": 12', {"items": [{"name": "B", "price": 12}]}),
+    ('{"items": [{"name": "B", "price": 12.', {"items": [{"name": "B", "price": 12}]}),
+])
+def test_truncated_after_number_keeps_it(text, expected):
+    bill, parser = parse(text)
+    assert bill == expected
+    assert parser.repaired